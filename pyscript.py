@@ -1,8 +1,12 @@
 import os
-import shutil
+import shlex
+import stat
 import subprocess
 import sys
 
+from scripts.fast_copy import fast_copytree
+
+
 def main():
     # 1. Get repo path dynamically (folder where this script lives)
     repo_path = os.path.dirname(os.path.abspath(__file__))
@@ -16,32 +20,46 @@ def main():
     dst_folder = os.path.join(repo_path, dst)
 
     # 4. Validate source folder exists
-    if not os.path.isdir(src_folder):
+    # One lstat, and never follow a symlinked source out of the repo
+    try:
+        src_mode = os.lstat(src_folder).st_mode
+    except OSError:
+        src_mode = 0
+    if stat.S_ISLNK(src_mode):
+        print(f"Source folder is a symlink, refusing to copy: {src_folder}")
+        sys.exit(1)
+    if not stat.S_ISDIR(src_mode):
         print(f"Source folder does not exist: {src_folder}")
         sys.exit(1)
 
     # 5. Check if destination folder already exists
-    if os.path.exists(dst_folder):
+    # lexists: a dangling symlink here would otherwise pass and be copied through
+    if os.path.lexists(dst_folder):
         print(f"Destination folder already exists: {dst_folder}")
         sys.exit(1)
 
     # 6. Copy source → destination
+    # COPY_HARDLINK=1 hardlinks files instead of copying them (write-once snapshots)
+    hardlink = os.environ.get("COPY_HARDLINK", "").strip().lower() in ("1", "true", "yes")
     print(f"Copying '{src}' → '{dst}' ...")
-    shutil.copytree(src_folder, dst_folder)
+    fast_copytree(src_folder, dst_folder, hardlink=hardlink)
     print("Copy complete!")
 
-    # 7. Git: add new folder
-    print(f"Running: git add {dst}")
-    subprocess.check_call(["git", "add", dst], cwd=repo_path)
-
-    # 8. Commit
+    # 7. Git: add, commit and push the new folder in a single shell invocation
     commit_message = f"Copy folder {src} to {dst}"
-    print(f"Running: git commit -m \"{commit_message}\"")
-    subprocess.check_call(["git", "commit", "-m", commit_message], cwd=repo_path)
-
-    # 9. Push
-    print("Running: git push origin main")
-    subprocess.check_call(["git", "push", "origin", "main"], cwd=repo_path)
+    git_commands = [
+        ["git", "add", "--", dst],
+        ["git", "commit", "-m", commit_message],
+        ["git", "push", "origin", "main"],
+    ]
+    cmd = " && ".join(shlex.join(c) for c in git_commands)
+    print(f"Running: {cmd}")
+    if sys.platform == "win32":
+        # No sh on a stock Windows install: run the steps one by one
+        for c in git_commands:
+            subprocess.check_call(c, cwd=repo_path)
+    else:
+        subprocess.check_call([b"sh", b"-c", os.fsencode(cmd)], cwd=repo_path)
 
     print(f"All done! Folder '{dst}' created, committed, and pushed.")
 
@@ -1,8 +1,12 @@
 import os
-import shutil
+import shlex
+import stat
 import subprocess
 import sys
 
+from scripts.fast_copy import fast_copytree
+
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: python copy_and_commit.py <source_folder> <dest_folder>")
@@ -16,27 +20,47 @@ def main():
     src_folder = os.path.join(repo_path, src)
     dst_folder = os.path.join(repo_path, dst)
 
-    if not os.path.isdir(src_folder):
+    # One lstat, and never follow a symlinked source out of the repo
+    try:
+        src_mode = os.lstat(src_folder).st_mode
+    except OSError:
+        src_mode = 0
+    if stat.S_ISLNK(src_mode):
+        print(f"Source folder is a symlink, refusing to copy: {src_folder}")
+        sys.exit(1)
+    if not stat.S_ISDIR(src_mode):
         print(f"Source folder does not exist: {src_folder}")
         sys.exit(1)
 
-    if os.path.exists(dst_folder):
+    # lexists: a dangling symlink here would otherwise pass and be copied through
+    if os.path.lexists(dst_folder):
         print(f"Destination folder already exists: {dst_folder}")
         sys.exit(1)
 
+    # COPY_HARDLINK=1 hardlinks files instead of copying them (write-once snapshots)
+    hardlink = os.environ.get("COPY_HARDLINK", "").strip().lower() in ("1", "true", "yes")
     print(f"Copying '{src}' → '{dst}' ...")
-    shutil.copytree(src_folder, dst_folder)
+    fast_copytree(src_folder, dst_folder, hardlink=hardlink)
     print("Copy complete.")
 
     # Git add/commit/push
-    subprocess.check_call(["git", "config", "user.name", "automation-bot"])
-    subprocess.check_call(["git", "config", "user.email", "bot@example.com"])
-
-    subprocess.check_call(["git", "add", dst], cwd=repo_path)
-
     commit_message = f"Copy folder {src} to {dst}"
-    subprocess.check_call(["git", "commit", "-m", commit_message], cwd=repo_path)
-    subprocess.check_call(["git", "push", "origin", "main"], cwd=repo_path)
+
+    git_commands = [
+        ["git", "config", "user.name", "automation-bot"],
+        ["git", "config", "user.email", "bot@example.com"],
+        ["git", "add", "--", dst],
+        ["git", "commit", "-m", commit_message],
+        ["git", "push", "origin", "main"],
+    ]
+    if sys.platform == "win32":
+        # No sh on a stock Windows install: run the steps one by one
+        for c in git_commands:
+            subprocess.check_call(c, cwd=repo_path)
+    else:
+        # Single shell invocation instead of one git process per step, args pre-encoded
+        cmd = os.fsencode(" && ".join(shlex.join(c) for c in git_commands))
+        subprocess.check_call([b"sh", b"-c", cmd], cwd=repo_path)
 
     print("All done! Folder copied, committed, and pushed.")
 
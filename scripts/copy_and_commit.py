@@ -1,8 +1,29 @@
 import os
-import shutil
+import stat
 import subprocess
 import sys
 
+from fast_copy import fast_copytree
+
+try:
+    # Optional: commit in-process through libgit2 instead of spawning git
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+GIT_USER_NAME = "automation-bot"
+GIT_USER_EMAIL = "bot@example.com"
+
+# Fixed parts of the git command lines, encoded once up front; subprocess takes
+# bytes args as-is instead of re-encoding every str on each call
+GIT = b"git"
+GIT_IDENTITY = [b"-c", os.fsencode(f"user.name={GIT_USER_NAME}"), b"-c", os.fsencode(f"user.email={GIT_USER_EMAIL}")]
+GIT_HEAD_COMMIT = [GIT, b"rev-parse", b"-q", b"--verify", b"HEAD^{commit}"]
+GIT_HASH_PATHS = [b"hash-object", b"-w", b"--stdin-paths"]
+GIT_HASH_STDIN = [b"hash-object", b"-w", b"--stdin"]
+GIT_MKTREE_BATCH = [GIT, b"mktree", b"-z", b"--batch"]
+GIT_UNTRACKED = [b"ls-files", b"-o", b"--exclude-standard", b"-z", b"--"]
+
 
 def resolve_repo_path(repo_path: str) -> str:
     """
@@ -31,14 +52,170 @@ def safe_join(base_dir: str, user_path: str) -> str:
 
     base_abs = os.path.abspath(base_dir)
 
-    # Ensure joined is within base_abs
-    common = os.path.commonpath([base_abs, joined])
-    if common != base_abs:
+    # Ensure joined is within base_abs: both are absolute and normalized, so a
+    # prefix check on a path-separator boundary is enough
+    base_cmp = os.path.normcase(base_abs)
+    joined_cmp = os.path.normcase(joined)
+    if joined_cmp != base_cmp and not joined_cmp.startswith(base_cmp.rstrip(os.sep) + os.sep):
         raise ValueError(f"Unsafe path (escapes repo root): {user_path}")
 
     return joined
 
 
+def git_output(args: list[bytes], cwd: str, input: bytes = b"") -> bytes:
+    """
+    Run a git plumbing command and return its raw stdout (stderr passes through).
+    """
+    return subprocess.run([GIT, *args], cwd=cwd, input=input, stdout=subprocess.PIPE, check=True).stdout
+
+
+def commit_with_plumbing(repo_path: str, dst_rel: str, message: str) -> None:
+    """
+    Commit the freshly copied dst_rel on HEAD without staging it first: every blob
+    is written by one `git hash-object --stdin-paths`, every tree by one
+    `git mktree --batch`, then `git commit-tree` + `git update-ref` move HEAD.
+    Paths excluded by .gitignore are left out, as `git add` would. Git hooks are
+    not run.
+    """
+    head = subprocess.run(GIT_HEAD_COMMIT, cwd=repo_path, stdout=subprocess.PIPE).stdout.strip()  # empty on an unborn branch
+
+    # Everything under dst_rel is new, so the untracked, non-ignored files are
+    # exactly what `git add` would pick up (symlinks included)
+    pathspec = b":(literal)" + os.fsencode(dst_rel)
+    addable = set(git_output([*GIT_UNTRACKED, pathspec], repo_path).split(b"\0"))
+
+    # Walk bottom-up so every subtree is built before its parent
+    dst_abs = os.path.join(repo_path, dst_rel)
+    files: list[str] = []
+    links: list[bytes] = []
+    walked: list[tuple[str, list[tuple[bytes, str, str, object]]]] = []
+    for root, subdirs, filenames in os.walk(dst_abs, topdown=False):
+        entries = []
+        for name in subdirs + filenames:
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            if not stat.S_ISDIR(st.st_mode):
+                rel = os.fsencode(os.path.relpath(path, repo_path).replace(os.sep, "/"))
+                if rel not in addable:
+                    continue
+            if stat.S_ISLNK(st.st_mode):
+                links.append(os.fsencode(os.readlink(path)))
+                entries.append((b"120000", name, "link", len(links) - 1))
+            elif stat.S_ISDIR(st.st_mode):
+                entries.append((b"040000", name, "tree", path))
+            elif stat.S_ISREG(st.st_mode):
+                files.append(os.path.relpath(path, repo_path))
+                mode = b"100755" if st.st_mode & stat.S_IXUSR else b"100644"
+                entries.append((mode, name, "blob", len(files) - 1))
+        walked.append((root, entries))
+
+    if any("\n" in f for f in files):
+        raise RuntimeError(f"Cannot commit file names containing newlines under {dst_rel}")
+    blobs = git_output(GIT_HASH_PATHS, repo_path, os.fsencode("".join(f + "\n" for f in files))).split()
+    link_blobs = [git_output(GIT_HASH_STDIN, repo_path, target).strip() for target in links]
+
+    mktree = subprocess.Popen(GIT_MKTREE_BATCH, cwd=repo_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def make_tree(records: list[bytes]) -> bytes:
+        # In batch mode an empty record ends the current tree
+        mktree.stdin.write(b"".join(r + b"\0" for r in records) + b"\0")
+        mktree.stdin.flush()
+        return mktree.stdout.readline().strip()
+
+    trees: dict[str, bytes] = {}
+    for root, entries in walked:
+        records = []
+        for mode, name, kind, ref in entries:
+            if kind == "tree":
+                sha = trees.get(ref)
+                if sha is None:
+                    # Empty directory: git doesn't track those
+                    continue
+                records.append(b"040000 tree " + sha + b"\t" + os.fsencode(name))
+            else:
+                sha = blobs[ref] if kind == "blob" else link_blobs[ref]
+                records.append(mode + b" blob " + sha + b"\t" + os.fsencode(name))
+        if records:
+            trees[root] = make_tree(records)
+
+    tree = trees.get(dst_abs)
+    if tree is None:
+        raise RuntimeError(f"Nothing to commit: {dst_rel} contains no files")
+
+    # Splice the new tree into HEAD's tree, one parent directory at a time
+    parts = dst_rel.split(os.sep)
+    for i in range(len(parts) - 1, -1, -1):
+        name = os.fsencode(parts[i])
+        existing = b""
+        if head:
+            existing = subprocess.run(
+                [GIT, b"ls-tree", b"-z", head + b":" + os.fsencode("/".join(parts[:i]))],
+                cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            ).stdout  # empty when that directory doesn't exist in HEAD yet
+        records = []
+        for record in existing.split(b"\0"):
+            if not record:
+                continue
+            if record.split(b"\t", 1)[1] == name:
+                if i == len(parts) - 1 and record == b"040000 tree " + tree + b"\t" + name:
+                    raise RuntimeError(f"Nothing to commit: {dst_rel} adds no changes")
+                continue
+            records.append(record)
+        records.append(b"040000 tree " + tree + b"\t" + name)
+        tree = make_tree(records)
+
+    mktree.stdin.close()
+    if mktree.wait() != 0:
+        raise subprocess.CalledProcessError(mktree.returncode, mktree.args)
+
+    message_b = os.fsencode(message)
+    commit_tree = [*GIT_IDENTITY, b"commit-tree", tree, b"-m", message_b]
+    if head:
+        commit_tree += [b"-p", head]
+    commit = git_output(commit_tree, repo_path).strip()
+
+    reflog = (b"commit: " if head else b"commit (initial): ") + message_b
+    git_output([b"update-ref", b"-m", reflog, b"HEAD", commit, *([head] if head else [])], repo_path)
+
+    # Bring the index up to date for just the new paths so the tree doesn't
+    # show them as staged deletions
+    git_output([b"reset", b"-q", b"--", pathspec], repo_path)
+
+
+def commit_with_pygit2(repo_path: str, dst_rel: str, message: str) -> None:
+    """
+    Stage everything under dst_rel that .gitignore doesn't exclude and commit it
+    on HEAD using libgit2, with the same identity the git CLI path configures.
+    Git hooks are not run.
+    """
+    repo = pygit2.Repository(repo_path)
+    repo.config["user.name"] = GIT_USER_NAME
+    repo.config["user.email"] = GIT_USER_EMAIL
+
+    # Add files one by one rather than via add_all() so names are never
+    # interpreted as pathspec globs
+    dst_abs = os.path.join(repo_path, dst_rel)
+    for root, dirs, files in os.walk(dst_abs):
+        # os.walk lists symlinks to directories under dirs (without descending);
+        # git stores them as links, so they get added like files
+        for name in dirs + files:
+            path = os.path.join(root, name)
+            if name in dirs and not os.path.islink(path):
+                continue
+            rel = os.path.relpath(path, repo_path).replace(os.sep, "/")
+            if not repo.path_is_ignored(rel):
+                repo.index.add(rel)
+    repo.index.write()
+    tree = repo.index.write_tree()
+
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    if parents and repo[parents[0]].tree_id == tree:
+        raise RuntimeError(f"Nothing to commit: {dst_rel} adds no changes")
+
+    author = pygit2.Signature(GIT_USER_NAME, GIT_USER_EMAIL)
+    repo.create_commit("HEAD", author, author, message, tree, parents)
+
+
 def main():
     # Usage:
     # python copy_and_commit.py <repo_path> <source_folder> <destination_path> <dest_folder>
@@ -70,7 +247,15 @@ def main():
         print(str(e))
         sys.exit(1)
 
-    if not os.path.isdir(src_folder):
+    # One lstat, and never follow a symlinked source out of the repo
+    try:
+        src_mode = os.lstat(src_folder).st_mode
+    except OSError:
+        src_mode = 0
+    if stat.S_ISLNK(src_mode):
+        print(f"Source folder is a symlink, refusing to copy: {src_folder}")
+        sys.exit(1)
+    if not stat.S_ISDIR(src_mode):
         print(f"Source folder does not exist: {src_folder}")
         sys.exit(1)
 
@@ -88,22 +273,25 @@ def main():
     # Make sure parent exists
     os.makedirs(dest_parent_abs, exist_ok=True)
 
-    if os.path.exists(dst_folder_abs):
+    # lexists: a dangling symlink here would otherwise pass and be copied through
+    if os.path.lexists(dst_folder_abs):
         print(f"Destination folder already exists: {dst_folder_abs}")
         sys.exit(1)
 
+    # COPY_HARDLINK=1 hardlinks files instead of copying them (write-once snapshots)
+    hardlink = os.environ.get("COPY_HARDLINK", "").strip().lower() in ("1", "true", "yes")
     print(f"Copying '{src}' → '{dst_folder_rel}' inside repo: {repo_path}")
-    shutil.copytree(src_folder, dst_folder_abs)
+    fast_copytree(src_folder, dst_folder_abs, hardlink=hardlink)
     print("Copy complete.")
 
     # Git add/commit inside the target repo
-    subprocess.check_call(["git", "config", "user.name", "automation-bot"], cwd=repo_path)
-    subprocess.check_call(["git", "config", "user.email", "bot@example.com"], cwd=repo_path)
-
-    subprocess.check_call(["git", "add", dst_folder_rel], cwd=repo_path)
-
     commit_message = f"Copy folder {src} to {dst_folder_rel}"
-    subprocess.check_call(["git", "commit", "-m", commit_message], cwd=repo_path)
+    commit = commit_with_pygit2 if pygit2 is not None else commit_with_plumbing
+    try:
+        commit(repo_path, dst_folder_rel, commit_message)
+    except RuntimeError as e:
+        print(str(e))
+        sys.exit(1)
 
     print("All done! Folder copied and committed.")
 
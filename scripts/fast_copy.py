@@ -0,0 +1,60 @@
+"""
+Folder copy helpers shared by the copy scripts (scripts/ and the repo root).
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """
+    copytree copy_function that hardlinks files, copying only when linking fails
+    (e.g. across filesystems).
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+    return dst
+
+
+def fast_copytree(src: str, dst: str, hardlink: bool = False) -> None:
+    """
+    Copy the src directory tree to dst with the platform's native copy tool, which
+    clones files (reflink / clonefile) instead of copying bytes when the filesystem
+    supports it. Falls back to shutil.copytree if the tool is missing or fails.
+
+    With hardlink=True files are hardlinked instead, which costs no data I/O at all
+    but means src and dst share contents: only use it for snapshots that are never
+    edited in place.
+    """
+    if hardlink:
+        shutil.copytree(src, dst, symlinks=True, copy_function=link_or_copy)
+        return
+
+    if sys.platform.startswith("linux"):
+        # coreutils silently does a regular copy when reflinks are unsupported;
+        # -R keeps symlinks as symlinks and file modes, without the rest of -a
+        cmd, max_ok = ["cp", "--reflink=auto", "-R", "--", src, dst], 0
+    elif sys.platform == "darwin":
+        # -c uses clonefile(2) on APFS
+        cmd, max_ok = ["cp", "-c", "-R", "--", src, dst], 0
+    elif sys.platform == "win32":
+        # robocopy exit codes below 8 mean success
+        cmd, max_ok = ["robocopy", src, dst, "/E", "/MT:16", "/NFL", "/NDL", "/NJH", "/NJS"], 7
+    else:
+        cmd, max_ok = None, 0
+
+    if cmd is not None:
+        try:
+            if subprocess.run(cmd).returncode <= max_ok:
+                return
+        except OSError:
+            pass
+        # Drop any partial copy before falling back
+        shutil.rmtree(dst, ignore_errors=True)
+
+    # Git only tracks contents, symlinks and the exec bit: copy symlinks as links
+    # and use shutil.copy (data + mode) instead of copy2's extra copystat() work
+    shutil.copytree(src, dst, symlinks=True, copy_function=shutil.copy)
@@ -1,42 +1,78 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import functools
+import glob
+import io
+import os
 from pathlib import Path
+import re
 import sys
-import pandas as pd
 from ruamel.yaml import YAML
+from ruamel.yaml.nodes import ScalarNode
 from ruamel.yaml.scalarstring import SingleQuotedScalarString
 
+# Built once and shared by every target file; YAML() setup is not free
+_YAML = YAML()
+_YAML.preserve_quotes = True
+_YAML.indent(mapping=2, sequence=4, offset=2)
+
 
 def read_key_values(input_path: Path, key_col: str, value_col: str, sheet: str | None) -> dict[str, str]:
     suffix = input_path.suffix.lower()
 
-    if suffix in [".xlsx", ".xls"]:
-        if sheet and str(sheet).strip() != "":
-            df = pd.read_excel(input_path, sheet_name=sheet, dtype=str)
-        else:
-        # default sheet (first sheet)
-            df = pd.read_excel(input_path, dtype=str)
+    if suffix == ".xlsx":
+        # Imported lazily so CSV inputs don't pay for it
+        import openpyxl
+
+        wb = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+        try:
+            if sheet and str(sheet).strip() != "":
+                ws = wb[sheet]
+            else:
+                # default sheet (first sheet)
+                ws = wb.worksheets[0]
+            rows = ws.iter_rows(values_only=True)
+            header = ["" if c is None else str(c) for c in next(rows, ())]
+            if key_col not in header or value_col not in header:
+                raise ValueError(
+                    f"Missing columns. Found: {header}. "
+                    f"Expected key_col='{key_col}', value_col='{value_col}'."
+                )
+            ki, vi = header.index(key_col), header.index(value_col)
+
+            updates: dict[str, str] = {}
+            for row in rows:
+                k = row[ki] if ki < len(row) else None
+                v = row[vi] if vi < len(row) else None
+                k = "" if k is None else str(k).strip()
+                if k != "":
+                    # If duplicate keys exist, later rows override earlier ones
+                    updates[k] = "" if v is None else str(v)
+            return updates
+        finally:
+            wb.close()
 
     elif suffix == ".csv":
-        df = pd.read_csv(input_path, dtype=str)
+        with input_path.open(newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            if key_col not in header or value_col not in header:
+                raise ValueError(
+                    f"Missing columns. Found: {header}. "
+                    f"Expected key_col='{key_col}', value_col='{value_col}'."
+                )
+            # If duplicate keys exist, later rows override earlier ones
+            return {
+                row[key_col].strip(): (row[value_col] or "")
+                for row in reader
+                if row[key_col] and row[key_col].strip()
+            }
     else:
-        raise ValueError(f"Unsupported input type: {suffix}. Use .csv, .xlsx, or .xls")
-
-    if key_col not in df.columns or value_col not in df.columns:
-        raise ValueError(
-            f"Missing columns. Found: {list(df.columns)}. "
-            f"Expected key_col='{key_col}', value_col='{value_col}'."
-        )
-
-    df = df[[key_col, value_col]].copy()
-    df[key_col] = df[key_col].astype(str).str.strip()
-    df[value_col] = df[value_col].fillna("").astype(str)
-
-    df = df[df[key_col] != ""]
-
-    # If duplicate keys exist, later rows override earlier ones
-    return dict(zip(df[key_col], df[value_col]))
+        raise ValueError(f"Unsupported input type: {suffix}. Use .csv or .xlsx")
 
 
 def load_yaml(yaml: YAML, path: Path) -> dict:
@@ -48,9 +84,144 @@ def load_yaml(yaml: YAML, path: Path) -> dict:
         return {} if data is None else data
 
 
-def dump_yaml(yaml: YAML, path: Path, data: dict) -> None:
-    with path.open("w", encoding="utf-8") as f:
-        yaml.dump(data, f)
+def dump_yaml(yaml: YAML, path: Path, data: dict, current: bytes | None = None) -> bool:
+    """
+    Serialize into memory and write the file in one go. Returns False without
+    touching the file when the output is byte-identical to current.
+    """
+    buf = io.StringIO()
+    yaml.dump(data, buf)
+    # Same newline translation a text-mode open("w") would apply
+    out = buf.getvalue().replace("\n", os.linesep).encode("utf-8")
+    if out == current:
+        return False
+    path.write_bytes(out)
+    return True
+
+
+# Key spellings key_pattern() can't see through: backslash escapes anywhere in the
+# file, explicit "? key" entries and "*alias" keys
+_KEY_SCAN_UNSAFE = re.compile(rb"\\|(?:^|[{,])[ \t]*[?*]", re.M)
+
+
+@functools.lru_cache(maxsize=None)
+def key_pattern(keys: frozenset[str]) -> re.Pattern[bytes] | None:
+    """
+    Byte regex matching any place where one of keys could appear as a mapping key.
+    Deliberately loose (indentation, quotes, tags/anchors, flow mappings): a false
+    positive only costs a full parse, a false negative would silently skip an update.
+    Returns None when some key could be spelled differently in the file (quotes or
+    backslashes inside it get escaped), so the caller must always parse.
+    """
+    if any(c in k for k in keys for c in "'\"\\"):
+        return None
+    alternatives = b"|".join(re.escape(k.encode("utf-8")) for k in sorted(keys))
+    return re.compile(
+        rb"(?:^|[{,])[ \t]*(?:[!&][^ \t\r\n,{}\[\]]*[ \t]+)*['\"]?(?:" + alternatives + rb")['\"]?[ \t]*:",
+        re.M,
+    )
+
+
+def keys_absent(raw: bytes, keys: frozenset[str]) -> bool:
+    """
+    True only when none of keys can possibly be a mapping key in raw, which is
+    safe to skip without parsing. Anything ambiguous returns False.
+    """
+    pattern = key_pattern(keys)
+    if pattern is None:
+        return False
+    # A UTF-8 BOM would otherwise hide a key on the first line from the ^ anchor
+    raw = raw.removeprefix(codecs.BOM_UTF8)
+    return _KEY_SCAN_UNSAFE.search(raw) is None and pattern.search(raw) is None
+
+
+# One top-level "key: value" line of a flat mapping; anything else sends the file to ruamel
+_FLAT_LINE = re.compile(r"(?P<key>[A-Za-z0-9_][A-Za-z0-9_.-]*):[ \t]+(?P<value>[^\r\n]*?)(?P<eol>\r?\n)?")
+_FLAT_SINGLE_QUOTED = re.compile(r"'(?P<text>(?:[^']|'')*)'(?P<rest>.*)")
+_FLAT_DOUBLE_QUOTED = re.compile(r'"(?P<text>[^"\\]*)"(?P<rest>.*)')
+_FLAT_PLAIN_INT = re.compile(r"0|-?[1-9][0-9]*")
+
+
+def _plain_scalar_tag(text: str) -> str:
+    return str(_YAML.resolver.resolve(ScalarNode, text, (True, False)))
+
+
+def _flat_scalar(value: str) -> tuple[str, str] | None:
+    """
+    Parse the value part of a flat line into (str(loaded value), trailing comment),
+    matching what ruamel would load. Returns None for anything not handled here.
+    """
+    for quoted in (_FLAT_SINGLE_QUOTED, _FLAT_DOUBLE_QUOTED):
+        m = quoted.fullmatch(value)
+        if m:
+            text, rest = m.group("text"), m.group("rest")
+            # Only whitespace and/or a " # comment" may follow the closing quote
+            if rest[:1] not in ("", " ", "\t") or (rest.strip() and not rest.lstrip().startswith("#")):
+                return None
+            return text.replace("''", "'") if quoted is _FLAT_SINGLE_QUOTED else text, rest
+
+    if value[:1] in "'\"&*!|>{[%@`#-?:,]":
+        return None
+    text = value.partition(" #")[0].rstrip()
+    rest = value[len(text):]
+    if ": " in text or text.endswith(":") or "\t#" in text:
+        return None
+
+    tag = _plain_scalar_tag(text)
+    if tag == "tag:yaml.org,2002:str" or (tag == "tag:yaml.org,2002:int" and _FLAT_PLAIN_INT.fullmatch(text)):
+        return text, rest
+    return None
+
+
+def update_flat_yaml(text: str, updates: dict[str, str], add_missing: bool) -> str | None:
+    """
+    Line-based update for files that are a flat mapping of simple scalars, leaving
+    every untouched byte as it was. Returns the new text (the same text when nothing
+    changed), or None if the file or an update is out of scope for this fast path.
+    """
+    lines = text.splitlines(keepends=True)
+    entries: dict[str, tuple[int, str, str]] = {}
+
+    for i, line in enumerate(lines):
+        # splitlines() also breaks on \x0c, \u2028 etc., which YAML doesn't
+        if i < len(lines) - 1 and not line.endswith("\n"):
+            return None
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        m = _FLAT_LINE.fullmatch(line)
+        if not m or m.group("key") in entries or _plain_scalar_tag(m.group("key")) != "tag:yaml.org,2002:str":
+            return None
+        parsed = _flat_scalar(m.group("value"))
+        if parsed is None:
+            return None
+        entries[m.group("key")] = (i, parsed[0], parsed[1])
+
+    eol = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    appended: list[str] = []
+
+    for k, v in updates.items():
+        if k not in entries and not add_missing:
+            continue
+        if not v.isprintable():
+            return None
+        new_val = "'" + v.replace("'", "''") + "'"
+        if k in entries:
+            i, current, rest = entries[k]
+            if current != v:
+                line_eol = lines[i][len(lines[i].rstrip("\r\n")):]
+                lines[i] = f"{k}: {new_val}{rest}{line_eol}"
+        else:
+            if not _FLAT_LINE.fullmatch(f"{k}: x") or _plain_scalar_tag(k) != "tag:yaml.org,2002:str":
+                return None
+            appended.append(f"{k}: {new_val}{eol}")
+
+    if appended:
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += eol
+        lines.extend(appended)
+
+    return "".join(lines)
 
 
 def update_one_yaml(
@@ -61,11 +232,26 @@ def update_one_yaml(
     """
     Returns True if file changed, False otherwise.
     """
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.indent(mapping=2, sequence=4, offset=2)
-
-    before = load_yaml(yaml, yaml_path)
+    if not yaml_path.exists():
+        raise FileNotFoundError(f"YAML file not found: {yaml_path}")
+    raw = yaml_path.read_bytes()
+
+    if not add_missing:
+        # Only existing keys can change, so skip the ruamel parse entirely when
+        # none of them even appear in the raw file.
+        if not updates or keys_absent(raw, frozenset(updates)):
+            return False
+
+    # Flat "key: value" files are rewritten line by line without a ruamel round-trip
+    text = raw.decode("utf-8")
+    new_text = update_flat_yaml(text, updates, add_missing)
+    if new_text is not None:
+        if new_text == text:
+            return False
+        yaml_path.write_bytes(new_text.encode("utf-8"))
+        return True
+
+    before = load_yaml(_YAML, yaml_path)
 
     # Work on a copy-like structure (ruamel uses CommentedMap; still ok)
     after = before
@@ -79,11 +265,26 @@ def update_one_yaml(
                 changed = True
 
     if changed:
-        dump_yaml(yaml, yaml_path, after)
+        # The round-trip can still re-emit exactly the same bytes
+        changed = dump_yaml(_YAML, yaml_path, after, current=raw)
 
     return changed
 
 
+def _update_worker(yaml_path: Path, updates: dict[str, str], add_missing: bool) -> tuple[bool, str | None]:
+    """
+    update_one_yaml() wrapper for the process pool: returns (changed, error message)
+    so failures come back as plain strings instead of pickled exceptions.
+    """
+    try:
+        return update_one_yaml(yaml_path=yaml_path, updates=updates, add_missing=add_missing), None
+    except Exception as e:
+        return False, str(e)
+
+
+_GLOB_CHARS = frozenset("*?[")
+
+
 def resolve_targets(targets: list[str]) -> list[Path]:
     """
     Targets can be:
@@ -97,22 +298,30 @@ def resolve_targets(targets: list[str]) -> list[Path]:
         p = Path(t)
 
         # Glob pattern if it contains wildcard chars
-        if any(ch in t for ch in ["*", "?", "["]):
-            resolved.extend([Path(x) for x in sorted(Path().glob(t))])
+        if not _GLOB_CHARS.isdisjoint(t):
+            # include_hidden (3.11+) matches dot-files/dirs like Path().glob and os.walk do
+            resolved.extend([Path(x) for x in sorted(glob.iglob(t, recursive=True, include_hidden=True))])
             continue
 
         if p.is_dir():
-            resolved.extend(sorted(list(p.rglob("*.yml")) + list(p.rglob("*.yaml"))))
+            # Single walk for both extensions instead of one rglob per extension
+            found = [
+                Path(root) / fn
+                for root, _dirs, files in os.walk(p)
+                for fn in files
+                if fn.endswith((".yml", ".yaml"))
+            ]
+            resolved.extend(sorted(found))
             continue
 
         # Regular file
         resolved.append(p)
 
-    # De-duplicate while preserving order
+    # De-duplicate while preserving order (lexically, without a stat per file)
     seen = set()
     uniq: list[Path] = []
     for p in resolved:
-        rp = p.resolve()
+        rp = os.path.abspath(p)
         if rp not in seen:
             seen.add(rp)
             uniq.append(p)
@@ -147,25 +356,38 @@ def main() -> int:
         print("ERROR: no YAML targets found from --targets", file=sys.stderr)
         return 2
 
+    update = functools.partial(_update_worker, updates=updates, add_missing=not args.no_add_missing)
+
+    # ruamel is pure Python and CPU-bound, so spread files across processes;
+    # a single file isn't worth the pool startup cost.
+    workers = min(os.cpu_count() or 1, len(yaml_files))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            chunksize = max(1, len(yaml_files) // (workers * 4))
+            results = list(ex.map(update, yaml_files, chunksize=chunksize))
+    else:
+        results = [update(y) for y in yaml_files]
+
+    # Every file has been processed either way, so report all of them before
+    # failing: a file written after an earlier error must still show up
     total_changed = 0
-    for y in yaml_files:
-        try:
-            changed = update_one_yaml(
-                yaml_path=y,
-                updates=updates,
-                add_missing=not args.no_add_missing,
-            )
-            if changed:
-                total_changed += 1
-                print(f"UPDATED: {y}")
-            else:
-                print(f"NO CHANGE: {y}")
-        except Exception as e:
-            print(f"ERROR updating {y}: {e}", file=sys.stderr)
-            return 1
+    total_failed = 0
+    for y, (changed, error) in zip(yaml_files, results):
+        if error is not None:
+            total_failed += 1
+            print(f"ERROR updating {y}: {error}", file=sys.stderr)
+        elif changed:
+            total_changed += 1
+            print(f"UPDATED: {y}")
+        else:
+            print(f"NO CHANGE: {y}")
 
     print(f"\nDone. Files changed: {total_changed} / {len(yaml_files)}")
 
+    if total_failed:
+        print(f"ERROR: {total_failed} file(s) could not be updated", file=sys.stderr)
+        return 1
+
     if args.fail_if_no_changes and total_changed == 0:
         print("ERROR: no files changed (fail-if-no-changes enabled)", file=sys.stderr)
         return 3